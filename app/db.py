@@ -6,8 +6,10 @@ Handles connection management, query execution, and safety checks.
 
 import os
 import re
+import time
 import logging
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, AsyncIterator, Tuple
+from collections import OrderedDict
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
@@ -39,11 +41,25 @@ logger = logging.getLogger(__name__)
 class DatabaseManager:
     """Manages database connections and operations"""
     
+    # Maximum number of table descriptions kept in memory
+    DESCRIBE_CACHE_SIZE = 1024
+    # Seconds a cached description is trusted before the catalog is asked again,
+    # so schema changes made by other clients are picked up
+    DESCRIBE_CACHE_TTL = float(os.getenv("SCHEMA_CACHE_TTL", "60"))
+    
     def __init__(self):
         self.database_url = self._get_database_url()
         self.database_type = self._detect_database_type()
         self.engine = None
         self.async_session_maker = None
+        # table name -> (expiry on the monotonic clock, columns)
+        self._describe_cache: "OrderedDict[str, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        # Bumped whenever the schema may have changed, so in-flight lookups
+        # started against an older schema don't repopulate the cache
+        self._schema_version = 0
+        # Bumped only by execute_unsafe_query, so callers caching data derived
+        # from the schema can tell when DDL may have run through this manager
+        self.ddl_generation = 0
         self._initialize_engine()
     
     def _get_database_url(self) -> str:
@@ -88,14 +104,27 @@ class DatabaseManager:
     def _initialize_engine(self):
         """Initialize SQLAlchemy async engine"""
         try:
+            if self.database_type == "sqlite":
+                # SQLite connections are local file handles, pooling gains nothing
+                pool_options = {"poolclass": NullPool}
+            else:
+                # Reuse connections across requests instead of paying the
+                # connect/auth handshake each time; pre-ping replaces stale ones
+                pool_options = {
+                    "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+                    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "5")),
+                    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "300")),
+                    "pool_pre_ping": True
+                }
+            
             self.engine = create_async_engine(
                 self.database_url,
-                poolclass=NullPool,
-                echo=False
+                echo=False,
+                **pool_options
             )
-            logger.info(f"Database engine initialized for {self.database_type}")
+            logger.info("Database engine initialized for %s", self.database_type)
         except Exception as e:
-            logger.error(f"Failed to initialize database engine: {e}")
+            logger.error("Failed to initialize database engine: %s", e)
             raise
     
     async def test_connection(self) -> bool:
@@ -105,7 +134,7 @@ class DatabaseManager:
                 await conn.execute(text("SELECT 1"))
             return True
         except Exception as e:
-            logger.error(f"Database connection test failed: {e}")
+            logger.error("Database connection test failed: %s", e)
             return False
     
     async def list_tables(self) -> List[Dict[str, Any]]:
@@ -166,10 +195,41 @@ class DatabaseManager:
                 
                 return tables
         except Exception as e:
-            logger.error(f"Error listing tables: {e}")
+            logger.error("Error listing tables: %s", e)
             raise
     
+    def invalidate_schema_cache(self):
+        """Forget cached table descriptions after a schema change"""
+        self._schema_version += 1
+        self._describe_cache.clear()
+    
+    def _cache_description(self, table_name: str, columns: List[Dict[str, Any]]):
+        """Store a table description, evicting the least recently used"""
+        if not columns:
+            # Unknown tables may be created at any moment, don't remember them
+            return
+        self._describe_cache[table_name] = (time.monotonic() + self.DESCRIBE_CACHE_TTL, columns)
+        self._describe_cache.move_to_end(table_name)
+        if len(self._describe_cache) > self.DESCRIBE_CACHE_SIZE:
+            self._describe_cache.popitem(last=False)
+    
     async def describe_table(self, table_name: str) -> List[Dict[str, Any]]:
+        """Get column information for a specific table, cached for DESCRIBE_CACHE_TTL seconds"""
+        entry = self._describe_cache.get(table_name)
+        if entry is not None:
+            expires, columns = entry
+            if time.monotonic() < expires:
+                self._describe_cache.move_to_end(table_name)
+                return columns
+            del self._describe_cache[table_name]
+        
+        version = self._schema_version
+        columns = await self._describe_table(table_name)
+        if version == self._schema_version:
+            self._cache_description(table_name, columns)
+        return columns
+    
+    async def _describe_table(self, table_name: str) -> List[Dict[str, Any]]:
         """Get column information for a specific table"""
         try:
             async with self.engine.begin() as conn:
@@ -218,9 +278,83 @@ class DatabaseManager:
                     for row in result
                 ]
         except Exception as e:
-            logger.error(f"Error describing table {table_name}: {e}")
+            logger.error("Error describing table %s: %s", table_name, e)
             raise
     
+    async def describe_all_tables(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Get column information for every table in a single query"""
+        try:
+            async with self.engine.begin() as conn:
+                if self.database_type == "postgresql":
+                    query = text("""
+                        SELECT
+                            c.table_name,
+                            c.column_name,
+                            c.data_type,
+                            c.is_nullable
+                        FROM information_schema.columns c
+                        JOIN information_schema.tables t
+                            ON t.table_schema = c.table_schema
+                            AND t.table_name = c.table_name
+                        WHERE c.table_schema = 'public'
+                        AND t.table_type = 'BASE TABLE'
+                        ORDER BY c.table_name, c.ordinal_position
+                    """)
+                elif self.database_type == "sqlite":
+                    query = text("""
+                        SELECT
+                            m.name,
+                            p.name,
+                            p.type,
+                            p."notnull"
+                        FROM sqlite_master m
+                        JOIN pragma_table_info(m.name) p
+                        WHERE m.type = 'table'
+                        AND m.name NOT LIKE 'sqlite_%'
+                        ORDER BY m.name, p.cid
+                    """)
+                else:  # MySQL
+                    query = text("""
+                        SELECT
+                            c.table_name,
+                            c.column_name,
+                            c.data_type,
+                            c.is_nullable
+                        FROM information_schema.columns c
+                        JOIN information_schema.tables t
+                            ON t.table_schema = c.table_schema
+                            AND t.table_name = c.table_name
+                        WHERE c.table_schema = DATABASE()
+                        AND t.table_type = 'BASE TABLE'
+                        ORDER BY c.table_name, c.ordinal_position
+                    """)
+
+                result = await conn.execute(query)
+
+                # Group columns by table in a single pass
+                tables: Dict[str, List[Dict[str, Any]]] = {}
+                for row in result:
+                    if self.database_type == "sqlite":
+                        is_nullable = not bool(row[3])  # notnull column
+                    else:
+                        is_nullable = row[3] == "YES"
+                    tables.setdefault(row[0], []).append({
+                        "column_name": row[1],
+                        "data_type": row[2],
+                        "is_nullable": is_nullable
+                    })
+
+                # A full read is the freshest view of the schema; replace any
+                # cached descriptions, including ones for dropped tables
+                self.invalidate_schema_cache()
+                for table_name, columns in tables.items():
+                    self._cache_description(table_name, columns)
+
+                return tables
+        except Exception as e:
+            logger.error("Error describing tables: %s", e)
+            raise
+
     def _is_query_safe(self, query: str) -> bool:
         """Check if query is safe (read-only operations only)"""
         # Remove comments and normalize whitespace
@@ -245,8 +379,8 @@ class DatabaseManager:
         
         return True
     
-    async def execute_safe_query(self, query: str, limit: int = 50) -> List[Dict[str, Any]]:
-        """Execute a query with safety checks"""
+    def _prepare_safe_query(self, query: str, limit: int) -> str:
+        """Validate a read-only query and enforce its LIMIT clause"""
         # Safety checks
         if not self._is_query_safe(query):
             raise ValueError("Query contains unsafe operations. Only SELECT queries are allowed.")
@@ -260,28 +394,74 @@ class DatabaseManager:
             # Add LIMIT clause
             query = f"{query.rstrip(';')} LIMIT {limit}"
         
+        return query
+    
+    @staticmethod
+    def _row_to_dict(keys: List[str], row: Any) -> Dict[str, Any]:
+        """Convert a result row to a JSON-friendly dictionary"""
+        row_dict = {}
+        for i, col in enumerate(keys):
+            value = row[i]
+            # Handle special types that aren't JSON serializable
+            if hasattr(value, 'isoformat'):  # datetime objects
+                value = value.isoformat()
+            elif hasattr(value, '__str__') and not isinstance(value, (str, int, float, bool, type(None))):
+                value = str(value)
+            row_dict[col] = value
+        return row_dict
+    
+    async def execute_safe_query(self, query: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Execute a query with safety checks"""
+        query = self._prepare_safe_query(query, limit)
+        
         try:
             async with self.engine.begin() as conn:
                 result = await conn.execute(text(query))
                 
                 # Convert rows to dictionaries
-                rows = []
-                for row in result:
-                    row_dict = {}
-                    for i, col in enumerate(result.keys()):
-                        value = row[i]
-                        # Handle special types that aren't JSON serializable
-                        if hasattr(value, 'isoformat'):  # datetime objects
-                            value = value.isoformat()
-                        elif hasattr(value, '__str__') and not isinstance(value, (str, int, float, bool, type(None))):
-                            value = str(value)
-                        row_dict[col] = value
-                    rows.append(row_dict)
+                keys = list(result.keys())
+                return [self._row_to_dict(keys, row) for row in result]
                 
-                return rows
+        except Exception as e:
+            logger.error("Error executing query: %s", e)
+            raise
+    
+    async def iter_safe_query(self, query: str, limit: int = 50) -> AsyncIterator[Dict[str, Any]]:
+        """Execute a query with safety checks, yielding rows as they arrive
+        
+        Uses a server-side cursor so rows are never buffered all at once.
+        """
+        query = self._prepare_safe_query(query, limit)
+        
+        try:
+            async with self.engine.connect() as conn:
+                result = await conn.stream(text(query))
+                keys = list(result.keys())
+                async for row in result:
+                    yield self._row_to_dict(keys, row)
                 
         except Exception as e:
-            logger.error(f"Error executing query: {e}")
+            logger.error("Error streaming query: %s", e)
+            raise
+    
+    async def sample_table(self, table_name: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """Fetch the first rows of a table
+        
+        The table name is quoted as an identifier and the limit is a bound
+        parameter, so the statement text is stable and can reuse cached plans.
+        """
+        quoted_name = self.engine.dialect.identifier_preparer.quote(table_name)
+        query = text(f"SELECT * FROM {quoted_name} LIMIT :limit")
+        
+        try:
+            async with self.engine.begin() as conn:
+                result = await conn.execute(query, {"limit": limit})
+                
+                keys = list(result.keys())
+                return [self._row_to_dict(keys, row) for row in result]
+                
+        except Exception as e:
+            logger.error("Error sampling table %s: %s", table_name, e)
             raise
     
     async def execute_unsafe_query(self, query: str) -> List[Dict[str, Any]]:
@@ -293,25 +473,20 @@ class DatabaseManager:
                 # Check if this query returns rows
                 if result.returns_rows:
                     # Convert rows to dictionaries
-                    rows = []
-                    for row in result:
-                        row_dict = {}
-                        for i, col in enumerate(result.keys()):
-                            value = row[i]
-                            # Handle special types that aren't JSON serializable
-                            if hasattr(value, 'isoformat'):  # datetime objects
-                                value = value.isoformat()
-                            elif hasattr(value, '__str__') and not isinstance(value, (str, int, float, bool, type(None))):
-                                value = str(value)
-                            row_dict[col] = value
-                        rows.append(row_dict)
-                    return rows
-                else:
-                    # For non-SELECT queries (INSERT, UPDATE, CREATE, DELETE, etc.)
-                    return [{"affected_rows": result.rowcount, "status": "success", "query_type": "modification"}]
+                    keys = list(result.keys())
+                    return [self._row_to_dict(keys, row) for row in result]
+                
+                affected_rows = result.rowcount
+            
+            # For non-SELECT queries (INSERT, UPDATE, CREATE, DELETE, etc.)
+            # The statement may have been DDL, so once it's committed drop
+            # cached descriptions and tell other schema caches to refresh
+            self.invalidate_schema_cache()
+            self.ddl_generation += 1
+            return [{"affected_rows": affected_rows, "status": "success", "query_type": "modification"}]
 
         except Exception as e:
-            logger.error(f"Error executing unsafe query: {e}")
+            logger.error("Error executing unsafe query: %s", e)
             raise
 
 # Global database manager instance
@@ -5,9 +5,12 @@ Uses HuggingFace transformers to convert natural language queries to SQL.
 """
 
 import os
+import json
+import hashlib
 import logging
 import re
-from typing import Dict, List, Any, Optional
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
 
 try:
     from transformers import T5ForConditionalGeneration, T5Tokenizer, pipeline
@@ -24,14 +27,23 @@ except (ImportError, AttributeError, RuntimeError) as e:
 
 logger = logging.getLogger(__name__)
 
+def schema_fingerprint(table_schemas: Dict[str, List[Dict[str, Any]]]) -> str:
+    """Stable hash of table schemas that changes whenever the schema does"""
+    payload = json.dumps(table_schemas, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
 class NLToSQLConverter:
     """Converts natural language queries to SQL using HuggingFace models"""
     
-    def __init__(self, model_name: str = "gaussalgo/T5-LM-Large-text2sql-spider"):
+    def __init__(self, model_name: str = "gaussalgo/T5-LM-Large-text2sql-spider", cache_size: int = 1024):
         self.model_name = model_name
         self.model = None
         self.tokenizer = None
         self.pipeline = None
+        self.cache_size = cache_size
+        self._sql_cache: "OrderedDict[str, str]" = OrderedDict()
+        # (schema fingerprint, rendered prompt prefix)
+        self._prompt_prefix: Optional[Tuple[str, str]] = None
         self._initialize_model()
     
     def _initialize_model(self):
@@ -60,13 +72,25 @@ class NLToSQLConverter:
         
         return " | ".join(context_parts)
     
+    def prime_schema_context(self, table_schemas: Dict[str, List[Dict[str, Any]]],
+                             schema_hash: Optional[str] = None) -> str:
+        """Render the schema part of the model prompt once per schema version"""
+        if schema_hash is None:
+            schema_hash = schema_fingerprint(table_schemas)
+        
+        if self._prompt_prefix is None or self._prompt_prefix[0] != schema_hash:
+            table_context = self._create_table_context(table_schemas)
+            self._prompt_prefix = (schema_hash, f"Tables: {table_context} | Question: ")
+        
+        return self._prompt_prefix[1]
+    
     def _generate_with_pipeline(self, prompt: str) -> str:
         """Generate SQL using the pipeline"""
         try:
             result = self.pipeline(prompt, max_length=512, num_return_sequences=1)
             return result[0]['generated_text'].strip()
         except Exception as e:
-            logger.error(f"Error generating with pipeline: {e}")
+            logger.error("Error generating with pipeline: %s", e)
             raise
     
     def _generate_with_model(self, prompt: str) -> str:
@@ -88,7 +112,7 @@ class NLToSQLConverter:
             sql = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
             return sql.strip()
         except Exception as e:
-            logger.error(f"Error generating with model: {e}")
+            logger.error("Error generating with model: %s", e)
             raise
     
     def _rule_based_fallback(self, nl_query: str, table_schemas: Dict[str, List[Dict[str, Any]]]) -> str:
@@ -138,17 +162,46 @@ class NLToSQLConverter:
         # Default fallback
         return f"SELECT * FROM {default_table}"
     
-    def convert_to_sql(self, nl_query: str, table_schemas: Dict[str, List[Dict[str, Any]]]) -> str:
+    def _cache_key(self, nl_query: str, schema_hash: str) -> str:
+        """Build the SQL cache key for a query against a given schema"""
+        # Only whitespace is normalized; case may matter for literal values
+        normalized = " ".join(nl_query.split())
+        return hashlib.sha256(f"{schema_hash}\0{normalized}".encode("utf-8")).hexdigest()
+    
+    def convert_to_sql(self, nl_query: str, table_schemas: Dict[str, List[Dict[str, Any]]],
+                       schema_hash: Optional[str] = None) -> str:
+        """Convert natural language query to SQL, reusing earlier conversions
+        
+        ``schema_hash`` is the fingerprint of ``table_schemas``; it is computed
+        when not supplied. Cached SQL is dropped implicitly when it changes.
+        """
+        if schema_hash is None:
+            schema_hash = schema_fingerprint(table_schemas)
+        
+        key = self._cache_key(nl_query, schema_hash)
+        sql = self._sql_cache.get(key)
+        if sql is not None:
+            self._sql_cache.move_to_end(key)
+            logger.debug("Cached SQL: %s", sql)
+            return sql
+        
+        sql = self._convert_to_sql(nl_query, table_schemas, schema_hash)
+        
+        self._sql_cache[key] = sql
+        if len(self._sql_cache) > self.cache_size:
+            self._sql_cache.popitem(last=False)
+        return sql
+    
+    def _convert_to_sql(self, nl_query: str, table_schemas: Dict[str, List[Dict[str, Any]]],
+                        schema_hash: str) -> str:
         """Convert natural language query to SQL"""
         try:
-            # Create table context
-            table_context = self._create_table_context(table_schemas)
-            
             # Try ML-based conversion first
             if self.pipeline or (self.model and self.tokenizer):
                 try:
-                    # Format prompt for the model
-                    prompt = f"Tables: {table_context} | Question: {nl_query} | SQL:"
+                    # Format prompt for the model, reusing the rendered schema context
+                    prompt_prefix = self.prime_schema_context(table_schemas, schema_hash)
+                    prompt = f"{prompt_prefix}{nl_query} | SQL:"
                     
                     if self.pipeline:
                         sql = self._generate_with_pipeline(prompt)
@@ -159,22 +212,22 @@ class NLToSQLConverter:
                     sql = self._clean_generated_sql(sql)
                     
                     if sql and self._is_valid_sql(sql):
-                        logger.info(f"Generated SQL: {sql}")
+                        logger.info("Generated SQL: %s", sql)
                         return sql
                     else:
                         logger.warning("Generated SQL is invalid, falling back to rule-based")
                         
                 except Exception as e:
-                    logger.error(f"ML-based conversion failed: {e}")
+                    logger.error("ML-based conversion failed: %s", e)
             
             # Fallback to rule-based approach
             sql = self._rule_based_fallback(nl_query, table_schemas)
-            logger.info(f"Rule-based SQL: {sql}")
+            logger.info("Rule-based SQL: %s", sql)
             return sql
             
         except Exception as e:
-            logger.error(f"Error converting NL to SQL: {e}")
-            raise ValueError(f"Failed to convert query to SQL: {str(e)}")
+            logger.error("Error converting NL to SQL: %s", e)
+            raise ValueError(f"Failed to convert query to SQL: {e}")
     
     def _clean_generated_sql(self, sql: str) -> str:
         """Clean up generated SQL"""
@@ -6,39 +6,27 @@ An MCP server that exposes relational databases to AI agents with natural langua
 
 import os
 import sys
+import time
+import asyncio
 import logging
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Callable, Awaitable, Tuple
 from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI, HTTPException, Depends
+import orjson
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, TypeAdapter
 
 try:
-    from .db import DatabaseManager, get_db_manager
-    from .nl_to_sql import NLToSQLConverter
+    from .db import DatabaseManager, get_db_manager, cleanup_db_manager
+    from .nl_to_sql import NLToSQLConverter, schema_fingerprint
 except ImportError:
     # Fallback for direct execution
     sys.path.insert(0, os.path.dirname(__file__))
-    from db import DatabaseManager, get_db_manager
-    from nl_to_sql import NLToSQLConverter
-
-# Import FastMCP instance from mcp_server.py for MCP protocol endpoints
-try:
-    # Add parent directory to path to import mcp_server
-    parent_dir = Path(__file__).parent.parent
-    if str(parent_dir) not in sys.path:
-        sys.path.insert(0, str(parent_dir))
-    
-    # Import the FastMCP instance and initialization function
-    from mcp_server import mcp, initialize_database
-    MCP_AVAILABLE = True
-except ImportError as e:
-    logger = logging.getLogger(__name__)
-    logger.warning(f"FastMCP not available: {e}. MCP protocol endpoints (/mcp, /sse) will not be available.")
-    MCP_AVAILABLE = False
-    mcp = None
+    from db import DatabaseManager, get_db_manager, cleanup_db_manager
+    from nl_to_sql import NLToSQLConverter, schema_fingerprint
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -67,9 +55,163 @@ class TableSchema(BaseModel):
     table_name: str
     columns: List[ColumnInfo]
 
+# Validate whole lists in pydantic-core instead of one model call per row
+_TABLES_ADAPTER = TypeAdapter(List[TableInfo])
+
+def _table_schema_dict(table_name: str, columns: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Shape raw column rows as TableSchema input without building models per column"""
+    return {
+        "table_name": table_name,
+        "columns": [
+            {
+                "column_name": col["column_name"],
+                "data_type": col["data_type"],
+                "is_nullable": col["is_nullable"]
+            }
+            for col in columns
+        ]
+    }
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson, much faster on large result sets"""
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
 # Global variables
 nl_converter: Optional[NLToSQLConverter] = None
 
+# Cached table schemas used as NL to SQL context
+SCHEMA_CACHE_TTL = float(os.getenv("SCHEMA_CACHE_TTL", "60"))
+_schema_cache: Dict[str, Any] = {
+    "value": None,
+    "fingerprint": None,
+    "expires": 0.0,
+    # DatabaseManager.ddl_generation the cached value was loaded at
+    "generation": None,
+    # Pre-serialized bodies for the schema endpoints
+    "list_tables_body": b"[]",
+    "describe_bodies": {}
+}
+
+# Introspection calls currently running, shared by concurrent requests
+_inflight: Dict[str, asyncio.Task] = {}
+
+async def _coalesce(key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+    """Run ``fetch`` once for all concurrent callers using the same key"""
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(fetch())
+        _inflight[key] = task
+        
+        def _done(finished: asyncio.Task) -> None:
+            if _inflight.get(key) is finished:
+                del _inflight[key]
+        
+        task.add_done_callback(_done)
+    
+    # Every caller, including the one that started it, waits through a shield
+    # so a cancelled request doesn't cancel the shared call for the others
+    return await asyncio.shield(task)
+
+def _build_schema_responses(table_schemas: Dict[str, List[Dict[str, Any]]]):
+    """Serialize the list_tables and describe responses once per schema refresh"""
+    tables = _TABLES_ADAPTER.validate_python([
+        {"table_name": table_name, "column_count": len(columns)}
+        for table_name, columns in table_schemas.items()
+    ])
+    _schema_cache["list_tables_body"] = _TABLES_ADAPTER.dump_json(tables)
+    _schema_cache["describe_bodies"] = {
+        table_name: TableSchema.model_validate(_table_schema_dict(table_name, columns)).model_dump_json().encode()
+        for table_name, columns in table_schemas.items()
+    }
+
+def _schema_response(request: Request, body: bytes) -> Response:
+    """Return a cached schema body, or 304 if the client already has this version"""
+    etag = f'W/"{_schema_cache["fingerprint"]}"'
+    headers = {"ETag": etag, "Cache-Control": "max-age=30"}
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        # Weak comparison: ignore the W/ prefix on either side
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if "*" in tags or etag.removeprefix("W/") in tags:
+            return Response(status_code=304, headers=headers)
+    
+    return Response(content=body, media_type="application/json", headers=headers)
+
+async def _get_all_schemas(db_manager: DatabaseManager, ttl: float = SCHEMA_CACHE_TTL) -> Dict[str, List[Dict[str, Any]]]:
+    """Return column information for every table
+    
+    Cached for ``ttl`` seconds, or until DDL runs through ``db_manager``.
+    """
+    generation = db_manager.ddl_generation
+    if (_schema_cache["value"] is not None
+            and _schema_cache["generation"] == generation
+            and time.monotonic() < _schema_cache["expires"]):
+        return _schema_cache["value"]
+    
+    async def refresh() -> Dict[str, List[Dict[str, Any]]]:
+        table_schemas = await db_manager.describe_all_tables()
+        _schema_cache["generation"] = generation
+        _schema_cache["value"] = table_schemas
+        _schema_cache["fingerprint"] = schema_fingerprint(table_schemas)
+        _build_schema_responses(table_schemas)
+        if nl_converter:
+            nl_converter.prime_schema_context(table_schemas, _schema_cache["fingerprint"])
+        _schema_cache["expires"] = time.monotonic() + ttl
+        return table_schemas
+    
+    # Don't join a refresh that started before the latest DDL
+    return await _coalesce(f"schemas:{generation}", refresh)
+
+async def _get_db(request: Request) -> DatabaseManager:
+    """Return the database manager created at startup"""
+    db_manager = getattr(request.app.state, "db_manager", None)
+    if db_manager is None:
+        # Startup couldn't reach the database; retry so the server recovers once it's up
+        db_manager = request.app.state.db_manager = await get_db_manager()
+    return db_manager
+
+def _try_load_mcp():
+    """Import the FastMCP instance and initialization function from mcp_server.py
+    
+    Deferred to startup so importing this module doesn't pull in the MCP stack.
+    Returns ``(None, None)`` when FastMCP is not installed.
+    """
+    try:
+        # Add parent directory to path to import mcp_server
+        parent_dir = Path(__file__).parent.parent
+        if str(parent_dir) not in sys.path:
+            sys.path.insert(0, str(parent_dir))
+        
+        from mcp_server import mcp, initialize_database
+        return mcp, initialize_database
+    except ImportError as e:
+        logger.warning("FastMCP not available: %s. MCP protocol endpoints (/mcp, /sse) will not be available.", e)
+        return None, None
+
+def _mount_mcp(app: FastAPI, mcp) -> None:
+    """Mount FastMCP HTTP endpoints for MCP protocol support (/mcp and /sse)
+    
+    Mounted after the REST routes so /mcp/list_tables and friends keep priority.
+    """
+    try:
+        # Mount streamable HTTP app at /mcp (support trailing slash variant)
+        mcp_http_app = mcp.streamable_http_app()
+        app.mount("/mcp", mcp_http_app)
+        app.mount("/mcp/", mcp_http_app)
+        logger.info("Mounted FastMCP streamable HTTP endpoint at /mcp (with and without trailing slash)")
+        
+        # Mount SSE app at /sse (support trailing slash variant)
+        mcp_sse_app = mcp.sse_app()
+        app.mount("/sse", mcp_sse_app)
+        app.mount("/sse/", mcp_sse_app)
+        logger.info("Mounted FastMCP SSE endpoint at /sse (with and without trailing slash)")
+    except Exception as e:
+        logger.error("Failed to mount FastMCP endpoints: %s", e)
+        logger.warning("MCP protocol endpoints (/mcp, /sse) will not be available")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager"""
@@ -77,25 +219,59 @@ async def lifespan(app: FastAPI):
     
     # Startup
     logger.info("Starting MCP Database Server...")
-    try:
-        nl_converter = NLToSQLConverter()
-        logger.info("NL to SQL converter initialized")
-    except Exception as e:
-        logger.error(f"Failed to initialize NL converter: {e}")
+    
+    # Load FastMCP and mount its endpoints if available
+    mcp, initialize_database = _try_load_mcp()
+    if mcp is not None and getattr(app.state, "mcp", None) is None:
+        _mount_mcp(app, mcp)
+    app.state.mcp = mcp
+    
+    # The converter and the shared database engine are independent, so set
+    # them up concurrently. The converter constructor may load a model, so it
+    # runs in a thread to keep the event loop free. FastMCP reuses both below.
+    converter_result, db_result = await asyncio.gather(
+        asyncio.to_thread(NLToSQLConverter),
+        get_db_manager(),
+        return_exceptions=True
+    )
+    
+    if isinstance(converter_result, BaseException):
+        logger.error("Failed to initialize NL converter: %s", converter_result)
         nl_converter = None
+    else:
+        nl_converter = converter_result
+        logger.info("NL to SQL converter initialized")
     
-    # Initialize FastMCP database connection if available
-    if MCP_AVAILABLE and mcp is not None:
+    if isinstance(db_result, BaseException):
+        logger.warning("Failed to initialize database connection pool: %s", db_result)
+        app.state.db_manager = None
+    else:
+        app.state.db_manager = db_result
+        logger.info("Database connection pool initialized")
+    
+    if mcp is not None:
+        # FastMCP tools share this process's engine and converter rather than
+        # opening their own pool and loading the model a second time
         try:
-            await initialize_database()
+            if app.state.db_manager is None:
+                raise RuntimeError("database connection pool is unavailable")
+            await initialize_database(manager=app.state.db_manager, converter=nl_converter)
             logger.info("FastMCP database initialized for MCP protocol endpoints")
         except Exception as e:
-            logger.warning(f"Failed to initialize FastMCP database: {e}. MCP endpoints may not work correctly.")
+            logger.warning("Failed to initialize FastMCP database: %s. MCP endpoints may not work correctly.", e)
+    
+    # Warm the schema cache and the converter's prompt context before serving
+    if app.state.db_manager is not None:
+        try:
+            await _get_all_schemas(app.state.db_manager)
+        except Exception as e:
+            logger.warning("Failed to load table schemas at startup: %s", e)
     
     yield
     
     # Shutdown
     logger.info("Shutting down MCP Database Server...")
+    await cleanup_db_manager()
 
 # Create FastAPI app
 app = FastAPI(
@@ -105,35 +281,31 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-# Add CORS middleware
+# Add CORS middleware with fixed allowlists so Starlette can precompute its headers.
+# CORS_ORIGINS is a comma-separated list; leaving it unset allows any origin.
+CORS_ORIGINS = [origin.strip() for origin in os.getenv("CORS_ORIGINS", "").split(",") if origin.strip()]
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=CORS_ORIGINS or ["*"],
+    # Credentialed requests are only valid against explicit origins
+    allow_credentials=bool(CORS_ORIGINS),
+    allow_methods=["GET", "POST", "DELETE", "OPTIONS"],
+    allow_headers=[
+        "Content-Type",
+        "Authorization",
+        "Accept",
+        "If-None-Match",
+        "Last-Event-ID",
+        "Mcp-Session-Id",
+        "Mcp-Protocol-Version"
+    ],
+    # Browsers hide non-safelisted response headers from scripts unless exposed
+    expose_headers=["ETag", "Mcp-Session-Id"],
+    # Let browsers cache preflight results for a day
+    max_age=86400,
 )
 
-# Mount FastMCP HTTP endpoints for MCP protocol support (/mcp and /sse)
-if MCP_AVAILABLE and mcp is not None:
-    try:
-        # Mount streamable HTTP app at /mcp (support trailing slash variant)
-        mcp_http_app = mcp.streamable_http_app()
-        app.mount("/mcp", mcp_http_app)
-        app.mount("/mcp/", mcp_http_app)
-        logger.info("Mounted FastMCP streamable HTTP endpoint at /mcp (with and without trailing slash)")
-        
-        # Mount SSE app at /sse (support trailing slash variant)
-        mcp_sse_app = mcp.sse_app()
-        app.mount("/sse", mcp_sse_app)
-        app.mount("/sse/", mcp_sse_app)
-        logger.info("Mounted FastMCP SSE endpoint at /sse (with and without trailing slash)")
-    except Exception as e:
-        logger.error(f"Failed to mount FastMCP endpoints: {e}")
-        logger.warning("MCP protocol endpoints (/mcp, /sse) will not be available")
-else:
-    logger.warning("FastMCP not available. MCP protocol endpoints (/mcp, /sse) will not be available")
-
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -145,63 +317,62 @@ async def health_check():
     }
 
 @app.get("/mcp/list_tables", response_model=List[TableInfo])
-async def list_tables(db_manager: DatabaseManager = Depends(get_db_manager)):
+async def list_tables(request: Request):
     """List all available tables in the database"""
     try:
-        tables = await db_manager.list_tables()
-        return [
-            TableInfo(
-                table_name=table["table_name"],
-                column_count=table["column_count"]
-            )
-            for table in tables
-        ]
+        db_manager = await _get_db(request)
+        await _get_all_schemas(db_manager)
+        return _schema_response(request, _schema_cache["list_tables_body"])
     except Exception as e:
-        logger.error(f"Error listing tables: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to list tables: {str(e)}")
+        logger.error("Error listing tables: %s", e)
+        raise HTTPException(status_code=500, detail=f"Failed to list tables: {e}")
 
 @app.get("/mcp/describe/{table_name}", response_model=TableSchema)
-async def describe_table(table_name: str, db_manager: DatabaseManager = Depends(get_db_manager)):
+async def describe_table(table_name: str, request: Request):
     """Get schema information for a specific table"""
     try:
+        db_manager = await _get_db(request)
+        await _get_all_schemas(db_manager)
+        body = _schema_cache["describe_bodies"].get(table_name)
+        if body is not None:
+            return _schema_response(request, body)
+        
         schema = await db_manager.describe_table(table_name)
-        return TableSchema(
-            table_name=table_name,
-            columns=[
-                ColumnInfo(
-                    column_name=col["column_name"],
-                    data_type=col["data_type"],
-                    is_nullable=col["is_nullable"]
-                )
-                for col in schema
-            ]
-        )
+        body = TableSchema.model_validate(_table_schema_dict(table_name, schema)).model_dump_json().encode()
+        return Response(content=body, media_type="application/json")
     except Exception as e:
-        logger.error(f"Error describing table {table_name}: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to describe table: {str(e)}")
+        logger.error("Error describing table %s: %s", table_name, e)
+        raise HTTPException(status_code=500, detail=f"Failed to describe table: {e}")
 
-@app.post("/mcp/query", response_model=QueryResponse)
-async def execute_nl_query(
-    request: QueryRequest,
-    db_manager: DatabaseManager = Depends(get_db_manager)
-):
-    """Convert natural language query to SQL and execute it"""
-    global nl_converter
-    
+async def _convert_nl_query(request: QueryRequest, http_request: Request) -> Tuple[DatabaseManager, str]:
+    """Translate a natural language query to SQL against the current schemas"""
     if not nl_converter:
         raise HTTPException(status_code=503, detail="NL to SQL converter not available")
     
     try:
+        db_manager = await _get_db(http_request)
+        
         # Get table schemas for context
-        tables = await db_manager.list_tables()
-        table_schemas = {}
-        for table in tables:
-            schema = await db_manager.describe_table(table["table_name"])
-            table_schemas[table["table_name"]] = schema
+        table_schemas = await _get_all_schemas(db_manager)
         
         # Convert natural language to SQL
-        sql_query = nl_converter.convert_to_sql(request.nl_query, table_schemas)
-        
+        sql_query = nl_converter.convert_to_sql(
+            request.nl_query,
+            table_schemas,
+            schema_hash=_schema_cache["fingerprint"]
+        )
+    except Exception as e:
+        logger.error("Error converting NL query %r: %s", request.nl_query, e)
+        raise HTTPException(status_code=500, detail=f"Failed to execute query: {e}")
+    
+    return db_manager, sql_query
+
+@app.post("/mcp/query", response_model=QueryResponse)
+async def execute_nl_query(request: QueryRequest, http_request: Request):
+    """Convert natural language query to SQL and execute it"""
+    db_manager, sql_query = await _convert_nl_query(request, http_request)
+    
+    try:
         # Execute the query with safety checks
         results = await db_manager.execute_safe_query(sql_query, limit=request.limit)
         
@@ -212,19 +383,57 @@ async def execute_nl_query(
         )
         
     except Exception as e:
-        logger.error(f"Error executing NL query '{request.nl_query}': {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to execute query: {str(e)}")
+        logger.error("Error executing NL query %r: %s", request.nl_query, e)
+        raise HTTPException(status_code=500, detail=f"Failed to execute query: {e}")
+
+@app.post("/mcp/query/stream")
+async def stream_nl_query(request: QueryRequest, http_request: Request):
+    """Convert natural language query to SQL and stream the rows as NDJSON"""
+    db_manager, sql_query = await _convert_nl_query(request, http_request)
+    
+    # Fetch the first row up front so query errors still produce a 500
+    rows = db_manager.iter_safe_query(sql_query, limit=request.limit)
+    try:
+        first_row = await rows.__anext__()
+    except StopAsyncIteration:
+        first_row = None
+    except Exception as e:
+        logger.error("Error executing NL query %r: %s", request.nl_query, e)
+        raise HTTPException(status_code=500, detail=f"Failed to execute query: {e}")
+    
+    async def generate():
+        try:
+            if first_row is None:
+                return
+            yield orjson.dumps(first_row, option=orjson.OPT_APPEND_NEWLINE)
+            async for row in rows:
+                yield orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE)
+        except Exception as e:
+            # Headers are already sent, so report the failure as the last line
+            logger.error("Error streaming NL query %r: %s", request.nl_query, e)
+            yield orjson.dumps({"error": f"Failed to execute query: {e}"}, option=orjson.OPT_APPEND_NEWLINE)
+        finally:
+            await rows.aclose()
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
 
-@app.get("/mcp/tables/{table_name}/sample")
+# No response model here, so FastAPI's pydantic dump_json fast path doesn't apply
+@app.get("/mcp/tables/{table_name}/sample", response_class=ORJSONResponse)
 async def get_table_sample(
     table_name: str,
-    limit: int = 5,
-    db_manager: DatabaseManager = Depends(get_db_manager)
+    request: Request,
+    limit: int = 5
 ):
     """Get a sample of data from a specific table"""
     try:
-        query = f"SELECT * FROM {table_name} LIMIT {min(limit, 50)}"
-        results = await db_manager.execute_safe_query(query, limit=min(limit, 50))
+        db_manager = await _get_db(request)
+        
+        # Only sample tables that actually exist, never arbitrary SQL fragments
+        table_schemas = await _get_all_schemas(db_manager)
+        if table_name not in table_schemas:
+            raise HTTPException(status_code=400, detail=f"Unknown table: {table_name}")
+        
+        results = await db_manager.sample_table(table_name, limit=max(0, min(limit, 50)))
         
         return {
             "table_name": table_name,
@@ -232,20 +441,30 @@ async def get_table_sample(
             "row_count": len(results)
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error getting sample from table {table_name}: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to get table sample: {str(e)}")
+        logger.error("Error getting sample from table %s: %s", table_name, e)
+        raise HTTPException(status_code=500, detail=f"Failed to get table sample: {e}")
 
 if __name__ == "__main__":
     import uvicorn
     
     port = int(os.getenv("PORT", 8000))
     host = os.getenv("HOST", "0.0.0.0")
+    reload = os.getenv("RELOAD", "false").lower() in ("1", "true", "yes")
+    workers = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
     
     uvicorn.run(
         "app.server:app",
         host=host,
         port=port,
-        reload=True,
-        log_level="info"
-    )
\ No newline at end of file
+        # uvicorn[standard] picks uvloop/httptools where they're available
+        loop="auto",
+        http="auto",
+        # Reload mode only supports a single process
+        reload=reload,
+        workers=1 if reload else workers,
+        access_log=False,
+        log_level=os.getenv("LOG_LEVEL", "warning").lower()
+    )
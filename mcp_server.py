@@ -218,10 +218,14 @@ async def connect_to_database(database_url: str) -> str:
             # Restore previous URL on failure
             if previous_url != 'None':
                 os.environ['DATABASE_URL'] = previous_url
+            await new_db_manager.engine.dispose()
             return f"Failed to connect to database: {database_url}"
         
-        # If successful, update the global manager
+        # If successful, update the global manager and release the old pool
+        previous_db_manager = db_manager
         db_manager = new_db_manager
+        if previous_db_manager is not None and previous_db_manager.engine is not None:
+            await previous_db_manager.engine.dispose()
         
         # Get table information
         tables = await db_manager.list_tables()
@@ -233,7 +237,7 @@ async def connect_to_database(database_url: str) -> str:
         response += f" Available Tables ({len(tables)}):\n"
         response += "\n".join(table_info) if table_info else "  No tables found"
         
-        logger.info(f"Dynamic database connection successful: {database_url}")
+        logger.info("Dynamic database connection successful: %s", database_url)
         return response
         
     except Exception as e:
@@ -242,7 +246,7 @@ async def connect_to_database(database_url: str) -> str:
             os.environ['DATABASE_URL'] = previous_url
         
         error_msg = f" Error connecting to database: {str(e)}"
-        logger.error(f"Dynamic database connection failed: {error_msg}")
+        logger.error("Dynamic database connection failed: %s", error_msg)
         return error_msg
 
 @mcp.tool()
@@ -477,11 +481,23 @@ async def get_database_schema() -> str:
     import json
     return json.dumps(schema_info, indent=2)
 
-async def initialize_database(database_url: str = None, config_file: str = None):
-    """Initialize the database connection"""
+async def initialize_database(database_url: str = None, config_file: str = None,
+                              manager: DatabaseManager = None, converter: NLToSQLConverter = None):
+    """Initialize the database connection
+    
+    When ``manager`` is given (e.g. by the HTTP server) its engine and
+    ``converter`` are reused instead of opening a second connection pool and
+    loading the model again.
+    """
     global db_manager, nl_converter
     
     try:
+        if manager is not None:
+            db_manager = manager
+            nl_converter = converter
+            logger.info("Using shared %s database connection", db_manager.database_type)
+            return
+        
         # Determine database URL from various sources
         final_database_url = None
         
@@ -498,9 +514,9 @@ async def initialize_database(database_url: str = None, config_file: str = None)
                 final_database_url = config.get('database_url')
                 if not final_database_url:
                     raise ValueError("database_url not found in config file")
-                logger.info(f"Using database URL from config file: {config_file}")
+                logger.info("Using database URL from config file: %s", config_file)
             except Exception as e:
-                logger.error(f"Failed to load config file {config_file}: {e}")
+                logger.error("Failed to load config file %s: %s", config_file, e)
                 raise
         else:
             final_database_url = os.getenv('DATABASE_URL')
@@ -515,7 +531,7 @@ async def initialize_database(database_url: str = None, config_file: str = None)
         
         db_manager = DatabaseManager()  # No parameter needed
         await db_manager.test_connection()
-        logger.info(f"Connected to database: {final_database_url}")
+        logger.info("Connected to database: %s", final_database_url)
         
         # Initialize NL to SQL converter
         nl_converter = NLToSQLConverter()
@@ -524,7 +540,7 @@ async def initialize_database(database_url: str = None, config_file: str = None)
         logger.info("Database initialized successfully")
         
     except Exception as e:
-        logger.error(f"Failed to initialize database: {e}")
+        logger.error("Failed to initialize database: %s", e)
         raise
 
 async def main(database_url: str = None, config_file: str = None):
@@ -6,27 +6,31 @@ This script tests if the MCP server is properly exposing the MCP protocol endpoi
 that Inspector can connect to.
 """
 
-import requests
+import asyncio
+import httpx
 import json
 import sys
 
-def test_endpoint(url, method="GET", data=None, headers=None):
+async def test_endpoint(client, path, method="GET", data=None, headers=None, stream=False):
     """Test an endpoint and return the result"""
     try:
-        if method == "GET":
-            response = requests.get(url, headers=headers, timeout=5)
+        if stream:
+            # Event streams never finish, so only wait for the response headers
+            async with client.stream(method, path, headers=headers) as response:
+                return response.status_code, ""
+        
+        if method in ("GET", "OPTIONS"):
+            response = await client.request(method, path, headers=headers)
         elif method == "POST":
-            response = requests.post(url, json=data, headers=headers, timeout=5)
-        elif method == "OPTIONS":
-            response = requests.options(url, headers=headers, timeout=5)
+            response = await client.post(path, json=data, headers=headers)
         else:
             return False, f"Unsupported method: {method}"
         
         return response.status_code, response.text[:200] if response.text else ""
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         return False, str(e)
 
-def main():
+async def main():
     if len(sys.argv) < 2:
         base_url = "http://localhost:8080"
         print(f"No URL provided, using default: {base_url}")
@@ -36,9 +40,45 @@ def main():
     print(f"\n🧪 Testing MCP endpoints at: {base_url}\n")
     print("=" * 60)
     
+    mcp_message = {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "method": "initialize",
+        "params": {
+            "protocolVersion": "2024-11-05",
+            "capabilities": {},
+            "clientInfo": {
+                "name": "test-client",
+                "version": "1.0.0"
+            }
+        }
+    }
+    
+    # Run every probe concurrently; results are reported in order below
+    async with httpx.AsyncClient(base_url=base_url, timeout=5) as client:
+        health, mcp_options, mcp_post, sse, list_tables = await asyncio.gather(
+            test_endpoint(client, "/health"),
+            test_endpoint(client, "/mcp", method="OPTIONS"),
+            test_endpoint(
+                client,
+                "/mcp",
+                method="POST",
+                data=mcp_message,
+                headers={"Content-Type": "application/json"}
+            ),
+            test_endpoint(
+                client,
+                "/sse",
+                method="GET",
+                headers={"Accept": "text/event-stream"},
+                stream=True
+            ),
+            test_endpoint(client, "/mcp/list_tables")
+        )
+    
     # Test health endpoint
     print("\n1. Testing /health endpoint...")
-    status, text = test_endpoint(f"{base_url}/health")
+    status, text = health
     if status == 200:
         print(f"   ✅ Health check passed: {status}")
         try:
@@ -51,7 +91,7 @@ def main():
     
     # Test /mcp endpoint (MCP protocol)
     print("\n2. Testing /mcp endpoint (MCP protocol)...")
-    status, text = test_endpoint(f"{base_url}/mcp", method="OPTIONS")
+    status, text = mcp_options
     if status in [200, 204]:
         print(f"   ✅ /mcp OPTIONS passed: {status}")
     else:
@@ -59,25 +99,7 @@ def main():
     
     # Test POST to /mcp (MCP protocol message)
     print("\n3. Testing POST /mcp (MCP protocol message)...")
-    mcp_message = {
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "initialize",
-        "params": {
-            "protocolVersion": "2024-11-05",
-            "capabilities": {},
-            "clientInfo": {
-                "name": "test-client",
-                "version": "1.0.0"
-            }
-        }
-    }
-    status, text = test_endpoint(
-        f"{base_url}/mcp",
-        method="POST",
-        data=mcp_message,
-        headers={"Content-Type": "application/json"}
-    )
+    status, text = mcp_post
     if status == 200:
         print(f"   ✅ /mcp POST passed: {status}")
         try:
@@ -93,11 +115,7 @@ def main():
     
     # Test /sse endpoint
     print("\n4. Testing /sse endpoint (Server-Sent Events)...")
-    status, text = test_endpoint(
-        f"{base_url}/sse",
-        method="GET",
-        headers={"Accept": "text/event-stream"}
-    )
+    status, text = sse
     if status == 200:
         print(f"   ✅ /sse endpoint accessible: {status}")
     elif status == 404:
@@ -107,7 +125,7 @@ def main():
     
     # Test REST API endpoints (should still work)
     print("\n5. Testing REST API endpoints...")
-    status, text = test_endpoint(f"{base_url}/mcp/list_tables")
+    status, text = list_tables
     if status == 200:
         print(f"   ✅ /mcp/list_tables passed: {status}")
     else:
@@ -122,10 +140,10 @@ def main():
 
 if __name__ == "__main__":
     try:
-        import requests
+        import httpx
     except ImportError:
-        print("❌ Error: 'requests' module not found. Install it with: pip install requests")
+        print("❌ Error: 'httpx' module not found. Install it with: pip install httpx")
         sys.exit(1)
     
-    main()
+    asyncio.run(main())
 
@@ -381,8 +381,23 @@ class MCPTestSuite:
         except Exception as e:
             print(f"    Describe table error: {e}")
             errors.append(f"Describe table error: {str(e)}")
-        
-        # Test 4: Execute safe query
+
+        # Test 4: Describe all tables in one query
+        total_tests += 1
+        try:
+            all_schemas = await self.db_manager.describe_all_tables()
+            customer_columns = await self.db_manager.describe_table('customers')
+            if all_schemas.get('customers') == customer_columns:
+                print(f"    Describe all tables passed: {len(all_schemas)} tables described")
+                tests_passed += 1
+            else:
+                print("    Describe all tables failed: customers schema does not match describe_table")
+                errors.append("describe_all_tables does not match describe_table for customers")
+        except Exception as e:
+            print(f"    Describe all tables error: {e}")
+            errors.append(f"Describe all tables error: {str(e)}")
+
+        # Test 5: Execute safe query
         total_tests += 1
         try:
             results = await self.db_manager.execute_safe_query("SELECT COUNT(*) as total FROM customers")
@@ -395,6 +410,137 @@ class MCPTestSuite:
         except Exception as e:
             print(f"    Execute safe query error: {e}")
             errors.append(f"Execute safe query error: {str(e)}")
+
+        # Test 6: Cached table descriptions pick up changes made by other clients
+        total_tests += 1
+        other_client = DatabaseManager()
+        original_ttl = self.db_manager.DESCRIBE_CACHE_TTL
+        try:
+            await other_client.execute_unsafe_query("DROP TABLE IF EXISTS cache_probe")
+            missing_columns = await self.db_manager.describe_table('cache_probe')
+            
+            await other_client.execute_unsafe_query("CREATE TABLE cache_probe (id INTEGER)")
+            created_columns = await self.db_manager.describe_table('cache_probe')
+            
+            def names(columns):
+                return [c['column_name'] for c in columns]
+            
+            # Within the TTL an external change is not seen until the cache is invalidated
+            await other_client.execute_unsafe_query("ALTER TABLE cache_probe ADD COLUMN note VARCHAR(50)")
+            cached_columns = await self.db_manager.describe_table('cache_probe')
+            self.db_manager.invalidate_schema_cache()
+            invalidated_columns = await self.db_manager.describe_table('cache_probe')
+            
+            # describe_all_tables replaces stale entries too
+            await other_client.execute_unsafe_query("ALTER TABLE cache_probe ADD COLUMN amount INTEGER")
+            await self.db_manager.describe_all_tables()
+            reloaded_columns = await self.db_manager.describe_table('cache_probe')
+            
+            # Entries expire on their own once the TTL has elapsed
+            self.db_manager.DESCRIBE_CACHE_TTL = 0
+            await self.db_manager.describe_all_tables()
+            await other_client.execute_unsafe_query("ALTER TABLE cache_probe ADD COLUMN flag INTEGER")
+            expired_columns = await self.db_manager.describe_table('cache_probe')
+            
+            if (not missing_columns and names(created_columns) == ['id']
+                    and names(cached_columns) == ['id']
+                    and names(invalidated_columns) == ['id', 'note']
+                    and names(reloaded_columns) == ['id', 'note', 'amount']
+                    and names(expired_columns) == ['id', 'note', 'amount', 'flag']):
+                print("    Describe cache invalidation passed: cache hits, invalidation and TTL expiry")
+                tests_passed += 1
+            else:
+                print(f"    Describe cache invalidation failed: {[names(c) for c in (missing_columns, created_columns, cached_columns, invalidated_columns, reloaded_columns, expired_columns)]}")
+                errors.append("Cached table descriptions did not pick up external schema changes")
+        except Exception as e:
+            print(f"    Describe cache invalidation error: {e}")
+            errors.append(f"Describe cache invalidation error: {str(e)}")
+        finally:
+            self.db_manager.DESCRIBE_CACHE_TTL = original_ttl
+            await other_client.execute_unsafe_query("DROP TABLE IF EXISTS cache_probe")
+            await other_client.engine.dispose()
+
+        # Test 7: Stream safe query rows
+        total_tests += 1
+        stream_query = "SELECT id, email FROM customers ORDER BY id"
+        try:
+            streamed = [row async for row in self.db_manager.iter_safe_query(stream_query, limit=3)]
+            expected = await self.db_manager.execute_safe_query(stream_query, limit=3)
+            empty = [row async for row in self.db_manager.iter_safe_query("SELECT id FROM customers WHERE id < 0")]
+            
+            try:
+                [row async for row in self.db_manager.iter_safe_query("DELETE FROM customers")]
+                rejected = False
+            except ValueError:
+                rejected = True
+            
+            if len(streamed) == 3 and streamed == expected and empty == [] and rejected:
+                print("    Stream safe query passed: LIMIT applied, empty and unsafe queries handled")
+                tests_passed += 1
+            else:
+                print(f"    Stream safe query failed: {streamed} / {empty} / rejected={rejected}")
+                errors.append("iter_safe_query returned unexpected rows")
+        except Exception as e:
+            print(f"    Stream safe query error: {e}")
+            errors.append(f"Stream safe query error: {str(e)}")
+        
+        # Test 8: Streaming NL query endpoint writes one NDJSON line per row
+        total_tests += 1
+        from fastapi import HTTPException
+        from starlette.requests import Request
+        import server
+        
+        class FixedSQLConverter(NLToSQLConverter):
+            """Returns preset SQL so each case controls what gets streamed"""
+            sql = stream_query
+            
+            def convert_to_sql(self, nl_query, table_schemas, schema_hash=None):
+                return self.sql
+        
+        async def stream_lines(sql: str) -> List[Dict[str, Any]]:
+            converter.sql = sql
+            response = await server.stream_nl_query(server.QueryRequest(nl_query="stream test", limit=3), request)
+            body = b"".join([chunk async for chunk in response.body_iterator])
+            return [json.loads(line) for line in body.splitlines()]
+        
+        original_iter = self.db_manager.iter_safe_query
+        
+        async def failing_iter(query: str, limit: int = 50):
+            async for row in original_iter(query, limit=limit):
+                yield row
+                raise RuntimeError("connection lost")
+        
+        original_converter = server.nl_converter
+        converter = server.nl_converter = FixedSQLConverter()
+        server.app.state.db_manager = self.db_manager
+        request = Request({"type": "http", "app": server.app})
+        try:
+            rows = await stream_lines(stream_query)
+            empty = await stream_lines("SELECT id FROM customers WHERE id < 0")
+            
+            try:
+                await stream_lines("DELETE FROM customers")
+                rejected_status = None
+            except HTTPException as e:
+                rejected_status = e.status_code
+            
+            self.db_manager.iter_safe_query = failing_iter
+            interrupted = await stream_lines(stream_query)
+            
+            if (rows == expected and empty == [] and rejected_status == 500
+                    and len(interrupted) == 2 and interrupted[0] == expected[0]
+                    and "connection lost" in interrupted[1].get("error", "")):
+                print("    Streaming endpoint passed: rows, empty result, rejection and trailing error")
+                tests_passed += 1
+            else:
+                print(f"    Streaming endpoint failed: {rows} / {empty} / {rejected_status} / {interrupted}")
+                errors.append("Streaming endpoint returned unexpected output")
+        except Exception as e:
+            print(f"    Streaming endpoint error: {e}")
+            errors.append(f"Streaming endpoint error: {str(e)}")
+        finally:
+            vars(self.db_manager).pop('iter_safe_query', None)
+            server.nl_converter = original_converter
         
         success = tests_passed == total_tests
         summary = f"{tests_passed}/{total_tests} database operation tests passed"
@@ -479,6 +625,80 @@ class MCPTestSuite:
                 print(f"    {description} caused unexpected error: {str(e)[:50]}...")
                 errors.append(f"{description}: Unexpected error")
         
+        # Table sampling only accepts known table names and quotes them itself
+        from fastapi import HTTPException
+        from starlette.requests import Request
+        import server
+        
+        server.app.state.db_manager = self.db_manager
+        request = Request({"type": "http", "app": server.app})
+        weird_table = self.db_manager.engine.dialect.identifier_preparer.quote('Weird Name')
+        total_tests += 2
+        
+        try:
+            # Load the schema cache first; the DDL below must refresh it without waiting for the TTL
+            await server._get_all_schemas(self.db_manager)
+            await self.db_manager.execute_unsafe_query(f"CREATE TABLE {weird_table} (id INTEGER)")
+            await self.db_manager.execute_unsafe_query(f"INSERT INTO {weird_table} (id) VALUES (1)")
+            
+            try:
+                await server.get_table_sample("customers;drop", request)
+                print("   SECURITY BREACH: Injected table name was sampled!")
+                errors.append("Security breach: injected table name")
+            except HTTPException as e:
+                if e.status_code == 400:
+                    print("    Injected table name rejected correctly")
+                    tests_passed += 1
+                else:
+                    print(f"    Injected table name failed with status {e.status_code}")
+                    errors.append(f"Injected table name: status {e.status_code}")
+            
+            sample = await server.get_table_sample("Weird Name", request)
+            if sample["row_count"] == 1 and sample["sample_data"][0]["id"] == 1:
+                print("    Table name needing quotes sampled correctly")
+                tests_passed += 1
+            else:
+                print(f"    Quoted table sample failed: {sample}")
+                errors.append("Quoted table sample returned wrong rows")
+        except Exception as e:
+            print(f"    Table sample test error: {e}")
+            errors.append(f"Table sample: {str(e)}")
+        finally:
+            await self.db_manager.execute_unsafe_query(f"DROP TABLE IF EXISTS {weird_table}")
+        
+        # Schema endpoints answer conditional requests with 304 only for the current ETag
+        def conditional_request(if_none_match: Optional[str] = None) -> Request:
+            headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+            return Request({"type": "http", "app": server.app, "headers": headers})
+        
+        try:
+            response = await server.list_tables(conditional_request())
+            etag = response.headers["etag"]
+            opaque_tag = etag.removeprefix("W/")
+            conditional_cases = [
+                ("Matching weak tag", etag, 304),
+                ("Matching strong tag", opaque_tag, 304),
+                ("Tag list", f'"stale", {etag}', 304),
+                ("Wildcard tag", "*", 304),
+                ("Stale tag", 'W/"stale"', 200)
+            ]
+            total_tests += len(conditional_cases)
+            
+            for description, if_none_match, expected_status in conditional_cases:
+                conditional = await server.list_tables(conditional_request(if_none_match))
+                expected_body = b"" if expected_status == 304 else response.body
+                if (conditional.status_code == expected_status
+                        and conditional.body == expected_body
+                        and conditional.headers["etag"] == etag):
+                    print(f"    {description} answered with {expected_status} correctly")
+                    tests_passed += 1
+                else:
+                    print(f"    {description} got {conditional.status_code}, expected {expected_status}")
+                    errors.append(f"{description}: status {conditional.status_code}")
+        except Exception as e:
+            print(f"    Conditional request test error: {e}")
+            errors.append(f"Conditional requests: {str(e)}")
+        
         success = tests_passed == total_tests
         summary = f"{tests_passed}/{total_tests} security tests passed"
         